@@ -6,8 +6,11 @@ headers = {'Authorization': f'Bearer {HF_TOKEN}'} if HF_TOKEN else {}
 payload={'inputs':'Explain briefly what a car is.','parameters':{'max_new_tokens':200,'temperature':0.6,'return_full_text':False}}
 url=f"{HF_API_URL}/{CHAT_MODEL}"
 print('Posting to', url)
+# Reuse one keep-alive connection across requests
+SESSION = requests.Session()
+SESSION.headers.update(headers)
 try:
-    r = requests.post(url, headers=headers, json=payload, timeout=60)
+    r = SESSION.post(url, json=payload, timeout=60)
     print('status', r.status_code)
     try:
         print(json.dumps(r.json(), indent=2)[:2000])
@@ -4,16 +4,38 @@ Using OpenAI API
 """
 
 import os
-from typing import List, Dict, Any
+import asyncio
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import List, Dict, Any, Literal, Optional
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-import requests
-import json
+import orjson
 import re
+import httpx
 import ollama
 
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+try:
+    import redis.asyncio as redis
+except ImportError:
+    redis = None
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
 # Load environment variables
 load_dotenv()
 
@@ -31,7 +53,11 @@ else:
     print("❌ No API Key found")
 
 # Initialize FastAPI app
-app = FastAPI(title="Smart Revision Assistant AI", version="2.0.0")
+app = FastAPI(
+    title="Smart Revision Assistant AI",
+    version="2.0.0",
+    default_response_class=ORJSONResponse
+)
 
 # Add CORS middleware
 app.add_middleware(
@@ -74,88 +100,436 @@ class StudyPlanResponse(BaseModel):
     recommendations: List[str]
     schedule: Dict[str, Any]
 
-def query_ollama(prompt: str, max_tokens: int = 400):
-    """Query local Ollama API"""
+class SessionRequest(BaseModel):
+    quiz: QuizRequest
+    summary: SummaryRequest
+    plan: StudyPlanRequest
+
+class SessionResponse(BaseModel):
+    quiz: QuizResponse
+    summary: SummaryResponse
+    plan: StudyPlanResponse
+
+class BatchItem(BaseModel):
+    kind: Literal["quiz", "summary", "chat", "plan"]
+    prompt: str
+    max_tokens: Optional[int] = Field(None, ge=1, le=1024)
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+
+class BatchResponse(BaseModel):
+    results: List[str]
+
+# Default generation budgets per prompt kind for batched requests
+BATCH_MAX_TOKENS = {
+    "quiz": 800,
+    "summary": 250,
+    "chat": 400,
+    "plan": 500,
+}
+# Upper bound on prompts per batch request, so one call cannot start unlimited generations
+BATCH_MAX_ITEMS = 8
+
+# Precompiled patterns for cleaning and parsing model output
+_JSON_PATTERNS = [
+    re.compile(r'\{[^{}]*"questions"[^{}]*\[[^\]]*\][^{}]*\}', re.DOTALL),
+]
+_PROMPT_ECHO_TOKENS = ("[INST]", "[/INST]", "<s>", "</s>")
+_WORD_CLEAN_RE = re.compile(r'[^\w]')
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+# LLM backend: "ollama" (default) or "llamacpp" for a llama.cpp llama-server, e.g.
+#   llama-server -m mistral-7b-instruct-v0.2.Q4_K_M.gguf -c 4096 --parallel 4 --cont-batching --port 8080
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'ollama').lower()
+LLAMACPP_URL = os.getenv('LLAMACPP_URL', 'http://localhost:8080')
+# llama-server adds the BOS token itself
+LLAMACPP_PROMPT_TEMPLATE = "[INST] {prompt} [/INST]"
+
+# Shared async clients so concurrent requests reuse one keep-alive pool
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+OLLAMA_HOST = os.getenv('OLLAMA_HOST')
+ollama_client = ollama.AsyncClient(host=OLLAMA_HOST, limits=HTTP_LIMITS)
+llamacpp_client = httpx.AsyncClient(base_url=LLAMACPP_URL, limits=HTTP_LIMITS, timeout=None)
+
+# In-process LRU of recent responses, keyed on model + prompt + budget.
+# Only deterministic (temperature 0) calls are cached; sampled calls such as
+# quiz generation must give a fresh answer each time.
+# Cache reads and writes never await, so no lock is needed on the event loop.
+OLLAMA_CACHE_SIZE = 512
+_ollama_cache: "OrderedDict[str, str]" = OrderedDict()
+
+# Optional Redis cache shared by all workers, enabled by setting REDIS_URL.
+# The in-process LRU is always kept as a fallback when Redis is unreachable.
+# Short timeouts keep an unreachable Redis from stalling requests, and after
+# a failure Redis is skipped for REDIS_BACKOFF seconds.
+REDIS_URL = os.getenv('REDIS_URL')
+CACHE_TTL = 3600
+REDIS_TIMEOUT = 0.25
+REDIS_BACKOFF = 30
+redis_client = redis.from_url(
+    REDIS_URL,
+    socket_connect_timeout=REDIS_TIMEOUT,
+    socket_timeout=REDIS_TIMEOUT
+) if redis is not None and REDIS_URL else None
+_redis_retry_at = 0.0
+
+def redis_available() -> bool:
+    return redis_client is not None and time.monotonic() >= _redis_retry_at
+
+def redis_failed(e: Exception):
+    """Log a Redis error and stop using Redis until the backoff expires"""
+    global _redis_retry_at
+    _redis_retry_at = time.monotonic() + REDIS_BACKOFF
+    print(f"Redis error: {str(e)} (retrying in {REDIS_BACKOFF}s)")
+
+def cache_key(prompt: str, max_tokens: int) -> str:
+    """Stable hash of everything that affects the generated text"""
+    payload = orjson.dumps(
+        {"backend": LLM_BACKEND, "model": CHAT_MODEL, "prompt": prompt, "max_tokens": max_tokens},
+        option=orjson.OPT_SORT_KEYS
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+class SemanticCache:
+    """Serve cached answers for paraphrased prompts using sentence embeddings.
+
+    Entries are grouped by scope (e.g. a hash of the study context) so that
+    similar questions about different material never share an answer. The
+    least recently used scope is dropped once max_scopes is reached.
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", threshold: float = 0.92,
+                 max_entries: int = 256, max_scopes: int = 128):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+        self.model = None
+        # scope -> (vectors [N, dim], responses); each entry is replaced as a whole
+        self.scopes: "OrderedDict[str, tuple]" = OrderedDict()
+        # lookup() runs in worker threads, so guard the model load and the scope LRU
+        self._model_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load the embedding model once; returns None if it is unavailable"""
+        with self._model_lock:
+            if self.model is None:
+                try:
+                    self.model = SentenceTransformer(self.model_name)
+                except Exception as e:
+                    # Remember the failure so requests do not retry the download
+                    print(f"Semantic cache disabled: {str(e)}")
+                    self.model = False
+        return self.model or None
+
+    def lookup(self, text: str, scope: str = ""):
+        """Return (cached response or None, embedding of text or None)"""
+        model = self.load()
+        if model is None:
+            return None, None
+        v = model.encode(text, normalize_embeddings=True)
+        with self._lock:
+            entry = self.scopes.get(scope)
+            if entry is not None:
+                self.scopes.move_to_end(scope)
+        if entry is not None:
+            vectors, responses = entry
+            sims = vectors @ v
+            best = int(sims.argmax())
+            if sims[best] > self.threshold:
+                return responses[best], v
+        return None, v
+
+    def add(self, vector, response: str, scope: str = ""):
+        with self._lock:
+            entry = self.scopes.get(scope)
+            if entry is None:
+                self.scopes[scope] = (vector[np.newaxis, :], [response])
+            else:
+                vectors, responses = entry
+                self.scopes[scope] = (
+                    np.vstack([vectors, vector])[-self.max_entries:],
+                    (responses + [response])[-self.max_entries:]
+                )
+            self.scopes.move_to_end(scope)
+            if len(self.scopes) > self.max_scopes:
+                self.scopes.popitem(last=False)
+
+# Optional: only enabled when sentence-transformers is installed
+semantic_cache = SemanticCache() if SentenceTransformer is not None else None
+
+@app.on_event("startup")
+async def load_semantic_model():
+    if semantic_cache is not None:
+        await asyncio.to_thread(semantic_cache.load)
+
+async def query_ollama(prompt: str, max_tokens: int = 400, temperature: float = None):
+    """Query local Ollama API without blocking the event loop.
+
+    temperature=None uses the model's default sampling; only calls made
+    with temperature 0 are served from and stored in the response cache.
+    """
+    key = cache_key(prompt, max_tokens) if temperature == 0 else None
+    if key is not None:
+        cached = await cache_get(key)
+        if cached is not None:
+            return cached
+
     try:
-        response = ollama.generate(
-            model=CHAT_MODEL,
-            prompt=prompt,
-            options={'num_predict': max_tokens}
-        )
-        return response['response'].strip()
+        if LLM_BACKEND == "llamacpp":
+            response = await llamacpp_client.post(
+                "/completion",
+                json=llamacpp_payload(prompt, max_tokens, temperature)
+            )
+            response.raise_for_status()
+            text = response.json()['content'].strip()
+        else:
+            response = await ollama_client.generate(
+                model=CHAT_MODEL,
+                prompt=prompt,
+                options=ollama_options(max_tokens, temperature)
+            )
+            text = response['response'].strip()
     except Exception as e:
-        print(f"Ollama error: {str(e)}")
+        print(f"{LLM_BACKEND} error: {str(e)}")
         return None
 
+    if key is not None:
+        await cache_set(key, text)
+    return text
+
+def ollama_options(max_tokens: int, temperature: float = None) -> dict:
+    """Ollama generation options; omits temperature to keep the model default"""
+    options = {'num_predict': max_tokens}
+    if temperature is not None:
+        options['temperature'] = temperature
+    return options
+
+def llamacpp_payload(prompt: str, max_tokens: int, temperature: float = None, stream: bool = False) -> dict:
+    """Request body for llama-server's /completion endpoint.
+
+    /completion does not apply the model's chat template (Ollama's generate
+    does), so the prompt is wrapped in Mistral's instruct format here.
+    """
+    payload = {"prompt": LLAMACPP_PROMPT_TEMPLATE.format(prompt=prompt), "n_predict": max_tokens}
+    if temperature is not None:
+        payload["temperature"] = temperature
+    if stream:
+        payload["stream"] = True
+    return payload
+
+async def cache_get(key: str):
+    """Look up a response in Redis, then in the in-process LRU"""
+    if redis_available():
+        try:
+            value = await redis_client.get(f"ollama:{key}")
+            if value is not None:
+                return value.decode()
+        except Exception as e:
+            redis_failed(e)
+
+    cached = _ollama_cache.get(key)
+    if cached is not None:
+        _ollama_cache.move_to_end(key)
+    return cached
+
+async def cache_set(key: str, text: str, ttl: int = CACHE_TTL):
+    """Store a response in the LRU (evicting the oldest entry) and in Redis"""
+    _ollama_cache[key] = text
+    if len(_ollama_cache) > OLLAMA_CACHE_SIZE:
+        _ollama_cache.popitem(last=False)
+
+    if redis_available():
+        try:
+            await redis_client.setex(f"ollama:{key}", ttl, text)
+        except Exception as e:
+            redis_failed(e)
+
+async def stream_ollama(prompt: str, max_tokens: int = 400, temperature: float = None):
+    """Yield response chunks from Ollama as they are generated"""
+    key = cache_key(prompt, max_tokens) if temperature == 0 else None
+    if key is not None:
+        cached = await cache_get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    parts = []
+    if LLM_BACKEND == "llamacpp":
+        chunks = stream_llamacpp(prompt, max_tokens, temperature)
+    else:
+        chunks = stream_ollama_chunks(prompt, max_tokens, temperature)
+    async for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+
+    if key is not None:
+        await cache_set(key, "".join(parts).strip())
+
+async def stream_ollama_chunks(prompt: str, max_tokens: int, temperature: float = None):
+    """Yield raw text chunks from the Ollama streaming API"""
+    stream = await ollama_client.generate(
+        model=CHAT_MODEL,
+        prompt=prompt,
+        options=ollama_options(max_tokens, temperature),
+        stream=True
+    )
+    async for chunk in stream:
+        yield chunk['response']
+
+async def stream_llamacpp(prompt: str, max_tokens: int, temperature: float = None):
+    """Yield raw text chunks from llama-server's streaming /completion endpoint"""
+    async with llamacpp_client.stream(
+        "POST",
+        "/completion",
+        json=llamacpp_payload(prompt, max_tokens, temperature, stream=True)
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("data: "):
+                yield orjson.loads(line[6:]).get('content', '')
+
+# Token budgets for notes/context sent to the model, with the previous
+# character limits used when no tokenizer is available
+TOKENIZER_NAME = os.getenv('TOKENIZER_NAME', 'mistralai/Mistral-7B-Instruct-v0.2')
+QUIZ_NOTES_TOKENS, QUIZ_NOTES_CHARS = 768, 1500
+SUMMARY_NOTES_TOKENS, SUMMARY_NOTES_CHARS = 512, 1024
+CHAT_CONTEXT_TOKENS, CHAT_CONTEXT_CHARS = 512, 1000
+MAX_CHARS_PER_TOKEN = 8
+_tokenizer = None
+
+def get_tokenizer():
+    """Load the tokenizer once; returns None if it is unavailable.
+
+    The Mistral repo is gated on the Hub, so HUGGINGFACE_TOKEN is passed
+    when set. Called at startup so the download never blocks a request.
+    """
+    global _tokenizer
+    if _tokenizer is None and Tokenizer is not None:
+        try:
+            _tokenizer = Tokenizer.from_pretrained(
+                TOKENIZER_NAME,
+                token=os.getenv('HUGGINGFACE_TOKEN')
+            )
+        except Exception as e:
+            print(f"Tokenizer error: {str(e)}")
+            _tokenizer = False
+    return _tokenizer or None
+
+@app.on_event("startup")
+async def load_tokenizer():
+    await asyncio.to_thread(get_tokenizer)
+
+def truncate_tokens(text: str, max_tokens: int, max_chars: int) -> str:
+    """Truncate text to at most max_tokens model tokens (max_chars without a tokenizer)"""
+    tokenizer = _tokenizer or None
+    if tokenizer is None:
+        return text[:max_chars]
+
+    # Slice first so large notes never pay for a full encode; 8 chars per token
+    # is roughly twice the English average, so the budget is still filled
+    text = text[:max_tokens * MAX_CHARS_PER_TOKEN]
+    ids = tokenizer.encode(text, add_special_tokens=False).ids
+    if len(ids) <= max_tokens:
+        return text
+    return tokenizer.decode(ids[:max_tokens])
+
 def extract_json_from_text(text: str) -> dict:
     """Extract JSON from text that might contain other content"""
+    # Nothing to parse without an opening brace
+    if not text or '{' not in text:
+        return None
+
     try:
         # Try direct JSON parse first
-        return json.loads(text)
+        return orjson.loads(text)
     except:
         pass
     
     # Try to find JSON in text
-    json_patterns = [
-        r'\{[^{}]*"questions"[^{}]*\[[^\]]*\][^{}]*\}',
-        r'\{.*?\}',
-    ]
-    
-    for pattern in json_patterns:
-        matches = re.findall(pattern, text, re.DOTALL)
+    for pattern in _JSON_PATTERNS:
+        matches = pattern.findall(text)
         for match in matches:
             try:
-                return json.loads(match)
+                return orjson.loads(match)
             except:
                 continue
+
+    # Fall back to every balanced {...} block, outermost first
+    for candidate in _iter_json_objects(text):
+        try:
+            return orjson.loads(candidate)
+        except:
+            continue
     
     return None
 
 
+def _iter_json_objects(text: str):
+    """Yield balanced top-level {...} substrings in a single linear scan.
+
+    Braces inside JSON strings are ignored, honouring backslash escapes.
+    """
+    depth = 0
+    start = -1
+    in_string = False
+    escaped = False
+    for i, c in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == '\\':
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"' and depth > 0:
+            in_string = True
+        elif c == '{':
+            depth += 1
+            if depth == 1:
+                start = i
+        elif c == '}' and depth > 0:
+            depth -= 1
+            if depth == 0:
+                yield text[start:i + 1]
+
+
 def clean_repeated_lines(text: str) -> str:
     """Clean obvious repeated consecutive lines or prompt echoes from model output."""
     if not text:
         return text
 
-    # Normalize line endings and split
-    lines = [l.rstrip() for l in text.replace('\r\n', '\n').split('\n')]
-
-    cleaned = []
+    out = []
     prev = None
-    repeat_count = 0
 
-    for line in lines:
-        # Skip empty lines that are purely whitespace
-        if line.strip() == "":
-            if prev is not None and cleaned and cleaned[-1].strip() != "":
-                cleaned.append("")
+    for raw in text.splitlines():
+        line = raw.rstrip()
+
+        # Keep a single blank line between non-empty lines
+        if not line.strip():
+            if out and out[-1]:
+                out.append("")
             prev = ""
             continue
 
+        # Skip raw lines repeated back to back
         if line == prev:
-            repeat_count += 1
-            # If a line repeats many times, skip the duplicate
-            if repeat_count > 0:
-                # only keep one occurrence (skip duplicates)
-                continue
-        else:
-            repeat_count = 0
+            continue
+        prev = line
 
         # Remove common prompt markers that the model might echo
-        cleaned_line = re.sub(r"\[/?INST\]|<s>|</s>", "", line).strip()
-        if cleaned_line:
-            cleaned.append(cleaned_line)
-        prev = line
+        for token in _PROMPT_ECHO_TOKENS:
+            line = line.replace(token, "")
+        line = line.strip()
 
-    # Collapse runs of identical short lines (defensive)
-    final_lines = []
-    for l in cleaned:
-        if final_lines and final_lines[-1] == l and len(l) < 120:
-            # skip duplicate short lines
+        # Collapse runs of identical short lines (defensive)
+        if not line or (out and out[-1] == line and len(line) < 120):
             continue
-        final_lines.append(l)
+        out.append(line)
 
-    return "\n".join(final_lines).strip()
+    return "\n".join(out).strip()
 
 
 def extract_model_text(result) -> str:
@@ -204,11 +578,11 @@ async def generate_quiz(request: QuizRequest):
     """Generate a personalized quiz using Hugging Face"""
     try:
         # Truncate notes for context
-        notes_text = request.notes[:1500]
+        notes_text = truncate_tokens(request.notes, QUIZ_NOTES_TOKENS, QUIZ_NOTES_CHARS)
         
         prompt = "Create {} multiple choice questions from these study notes: {}".format(request.num_questions, notes_text)
 
-        result = query_ollama(prompt, max_tokens=800)
+        result = await query_ollama(prompt, max_tokens=800)
         # Clean repeated lines and prompt echoes
         result = clean_repeated_lines(result)
         
@@ -219,29 +593,27 @@ async def generate_quiz(request: QuizRequest):
             return QuizResponse(questions=quiz_data["questions"][:request.num_questions])
         
         # Fallback: Generate rule-based quiz
-        questions = generate_fallback_quiz(notes_text, request.num_questions)
+        questions = await asyncio.to_thread(generate_fallback_quiz, notes_text, request.num_questions)
         return QuizResponse(questions=questions)
         
     except Exception as e:
         print(f"Quiz generation error: {str(e)}")
-        questions = generate_fallback_quiz(request.notes[:500], request.num_questions)
+        questions = await asyncio.to_thread(generate_fallback_quiz, request.notes[:500], request.num_questions)
         return QuizResponse(questions=questions)
 
+def split_sentences(text: str, min_length: int = 20) -> List[str]:
+    """Split text on sentence boundaries, keeping sentences longer than min_length"""
+    return [s for s in _SENT_SPLIT.split(text.strip()) if len(s) > min_length]
+
 def generate_fallback_quiz(text: str, num_questions: int = 5) -> List[Dict]:
     """Generate quiz using rule-based approach as fallback"""
-    sentences = [s.strip() for s in text.split('.') if len(s.strip()) > 20]
+    sentences = split_sentences(text)
     questions = []
     
     # Extract key terms (words that appear multiple times)
-    words = text.lower().split()
-    word_freq = {}
-    for word in words:
-        clean = re.sub(r'[^\w]', '', word)
-        if len(clean) > 4:
-            word_freq[clean] = word_freq.get(clean, 0) + 1
-    
-    key_terms = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]
-    key_terms = [term[0] for term in key_terms]
+    cleaned = (_WORD_CLEAN_RE.sub('', word) for word in text.lower().split())
+    word_freq = Counter(word for word in cleaned if len(word) > 4)
+    key_terms = [term for term, _ in word_freq.most_common(10)]
     
     for i in range(min(num_questions, len(sentences))):
         if i < len(sentences):
@@ -294,19 +666,19 @@ async def summarize_notes(request: SummaryRequest):
     """Summarize study notes using Hugging Face"""
     try:
         # Truncate input for summarization model
-        text = request.notes[:1024]
+        text = truncate_tokens(request.notes, SUMMARY_NOTES_TOKENS, SUMMARY_NOTES_CHARS)
         
         prompt = f"You are a summarization assistant. Summarize the following text concisely.\n\nSummarize this text in {request.max_length} words or less:\n\n{text}"
         
-        summary = query_ollama(prompt, max_tokens=request.max_length + 50)
+        summary = await query_ollama(prompt, max_tokens=request.max_length + 50, temperature=0)
         summary = clean_repeated_lines(summary)
         if summary:
             return SummaryResponse(summary=summary)
         
         # Fallback: Extract first and last sentences
-        sentences = [s.strip() for s in request.notes.split('.') if len(s.strip()) > 20]
+        sentences = split_sentences(request.notes)
         if len(sentences) >= 2:
-            summary = f"{sentences[0]}. {sentences[-1]}."
+            summary = f"{sentences[0]} {sentences[-1]}"
         else:
             summary = request.notes[:request.max_length] + "..."
         
@@ -315,74 +687,156 @@ async def summarize_notes(request: SummaryRequest):
     except Exception as e:
         print(f"Summarization error: {str(e)}")
         # Simple fallback
-        sentences = [s.strip() for s in request.notes.split('.') if len(s.strip()) > 10]
-        summary = '. '.join(sentences[:3]) + '.'
+        sentences = split_sentences(request.notes, 10)
+        summary = ' '.join(sentences[:3])
         return SummaryResponse(summary=summary[:request.max_length])
 
-@app.post("/api/chat", response_model=ChatResponse)
+CHAT_PROMPT = """You are a knowledgeable study tutor helping students with their coursework. Use the provided study material to give accurate, relevant answers to the student's question.{ctx}
+
+Student's Question: {msg}
+
+Answer based on the study material when relevant, and provide clear explanations with examples. If the question isn't covered in the material, give general study advice."""
+
+def build_chat_prompt(request: ChatRequest) -> str:
+    """Build the tutor prompt from the question and optional study context"""
+    context_text = f"\n\nStudy Material Context:\n{truncate_tokens(request.context, CHAT_CONTEXT_TOKENS, CHAT_CONTEXT_CHARS)}" if request.context else ""
+    return CHAT_PROMPT.format(ctx=context_text, msg=request.message)
+
+async def lookup_semantic_cache(request: ChatRequest):
+    """Return (cached answer, embedding, scope) for a chat request"""
+    # Paraphrased questions about the same material reuse earlier answers
+    scope = hashlib.sha256(request.context.encode()).hexdigest()
+    if semantic_cache is None:
+        return None, None, scope
+    # Cache errors count as a miss so they never decide whether the LLM is called
+    try:
+        cached, embedding = await asyncio.to_thread(semantic_cache.lookup, request.message, scope)
+    except Exception as e:
+        print(f"Semantic cache error: {str(e)}")
+        return None, None, scope
+    return cached, embedding, scope
+
+def remember_semantic(embedding, response_text: str, scope: str):
+    """Store an answer in the semantic cache, ignoring cache errors"""
+    if embedding is None:
+        return
+    try:
+        semantic_cache.add(embedding, response_text, scope)
+    except Exception as e:
+        print(f"Semantic cache error: {str(e)}")
+
+def sse_event(text: str, done: bool = False, error: bool = False) -> bytes:
+    """Format a chunk of text as a Server-Sent Event.
+
+    The final event has done=True and carries the full cleaned answer,
+    which replaces the raw chunks the client has shown so far. error=True
+    marks a final event holding the fallback after a failed generation.
+    """
+    payload = {'response': text}
+    if done:
+        payload['done'] = True
+    if error:
+        payload['error'] = True
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+async def chat_events(request: ChatRequest):
+    """Stream the tutor's answer, falling back to canned advice on failure"""
+    parts = []
+    embedding = None
+    try:
+        cached, embedding, scope = await lookup_semantic_cache(request)
+        if cached:
+            yield sse_event(cached, done=True)
+            return
+
+        async for chunk in stream_ollama(build_chat_prompt(request), max_tokens=400, temperature=0):
+            parts.append(chunk)
+            yield sse_event(chunk)
+    except Exception as e:
+        # A partial answer is neither cached nor kept; send the fallback instead
+        print(f"Chat error: {str(e)}")
+        fallback = await asyncio.to_thread(get_fallback_response, request.message)
+        yield sse_event(fallback, done=True, error=True)
+        return
+
+    # Clean repeated lines and prompt echoes from the full answer
+    response_text = clean_repeated_lines("".join(parts))
+    if not response_text:
+        response_text = await asyncio.to_thread(get_fallback_response, request.message)
+    else:
+        remember_semantic(embedding, response_text, scope)
+    yield sse_event(response_text, done=True)
+
+@app.post("/api/chat")
 async def chat_with_tutor(request: ChatRequest):
-    """Chat with AI tutor using Hugging Face"""
+    """Chat with AI tutor, streaming tokens as Server-Sent Events"""
+    print(f"Chat request: {request.message[:50]}...")
+    return StreamingResponse(chat_events(request), media_type="text/event-stream")
+
+@app.post("/api/chat/sync", response_model=ChatResponse)
+async def chat_with_tutor_sync(request: ChatRequest):
+    """Chat with AI tutor and return the full answer in one response"""
     print(f"Chat request: {request.message[:50]}...")
     try:
-        context_text = f"\n\nStudy Material Context:\n{request.context[:1000]}" if request.context else ""
-        
-        prompt = f"""You are a knowledgeable study tutor helping students with their coursework. Use the provided study material to give accurate, relevant answers to the student's question.{context_text}
+        prompt = build_chat_prompt(request)
 
-Student's Question: {request.message}
+        cached, embedding, scope = await lookup_semantic_cache(request)
+        if cached:
+            return ChatResponse(response=cached)
 
-Answer based on the study material when relevant, and provide clear explanations with examples. If the question isn't covered in the material, give general study advice."""
-        
-        response_text = query_ollama(prompt, max_tokens=400)
+        response_text = await query_ollama(prompt, max_tokens=400, temperature=0)
         # Clean repeated lines and prompt echoes
         response_text = clean_repeated_lines(response_text)
         if response_text:
+            remember_semantic(embedding, response_text, scope)
             return ChatResponse(response=response_text)
         
         # Fallback response
-        return ChatResponse(response=fallback)
+        return ChatResponse(response=await asyncio.to_thread(get_fallback_response, request.message))
         
     except Exception as e:
         print(f"Chat error: {str(e)}")
-        fallback = get_fallback_response(request.message)
+        fallback = await asyncio.to_thread(get_fallback_response, request.message)
         return ChatResponse(response=fallback)
 
+# Keyword sets and canned replies used when the model is unavailable
+TOPIC_RESPONSES = [
+    (frozenset({"math", "maths", "mathematics", "calculate", "calculated", "calculating",
+                "calculation", "calculations", "equation", "equations",
+                "formula", "formulas", "formulae"}),
+     "For math problems, break them down step by step. First identify what you're solving for, list the given values, then apply the appropriate formula. Would you like help with a specific problem?"),
+    (frozenset({"history", "historical", "date", "dates", "event", "events",
+                "war", "wars", "warfare"}),
+     "When studying history, focus on causes and effects. Create timelines to visualize the sequence of events. Understanding 'why' things happened is more important than just memorizing dates. What specific period are you studying?"),
+    (frozenset({"science", "sciences", "physics", "chemistry", "biology"}),
+     "Science concepts often build on each other. Make sure you understand the fundamentals first. Use diagrams and practice problems to reinforce your understanding. What specific concept are you working on?"),
+    (frozenset({"study", "studies", "studying", "studied", "learn", "learning", "learned",
+                "learnt", "remember", "remembering", "remembered", "memorize",
+                "memorizing", "memorized", "memorization"}),
+     "Effective study techniques include: 1) Spaced repetition - review material over increasing intervals, 2) Active recall - test yourself without looking at notes, 3) Teach others - explaining concepts helps solidify understanding. Use the Pomodoro technique: 25 minutes focused study, 5 minute break."),
+    (frozenset({"exam", "exams", "examination", "examinations", "test", "tests",
+                "tested", "testing", "quiz", "quizzes"}),
+     "For exam prep: 1) Review past papers and practice questions, 2) Focus on areas where you're weakest, 3) Get enough sleep before the exam, 4) During the test, read questions carefully and manage your time. Start with questions you know well to build confidence."),
+]
+
+DEFAULT_TOPIC_RESPONSE = "I'm here to help with your studies! You can ask me about specific subjects (math, science, history), study techniques, exam preparation, or any concept you're learning. What would you like to know more about?"
+
+_TOKEN_RE = re.compile(r"\w+")
+
 def get_fallback_response(message: str) -> str:
     """Generate fallback response based on keywords"""
-    msg_lower = message.lower()
-    
-    if any(word in msg_lower for word in ["math", "calculate", "equation", "formula"]):
-        return "For math problems, break them down step by step. First identify what you're solving for, list the given values, then apply the appropriate formula. Would you like help with a specific problem?"
-    
-    elif any(word in msg_lower for word in ["history", "date", "event", "war"]):
-        return "When studying history, focus on causes and effects. Create timelines to visualize the sequence of events. Understanding 'why' things happened is more important than just memorizing dates. What specific period are you studying?"
-    
-    elif any(word in msg_lower for word in ["science", "physics", "chemistry", "biology"]):
-        return "Science concepts often build on each other. Make sure you understand the fundamentals first. Use diagrams and practice problems to reinforce your understanding. What specific concept are you working on?"
-    
-    elif any(word in msg_lower for word in ["study", "learn", "remember", "memorize"]):
-        return "Effective study techniques include: 1) Spaced repetition - review material over increasing intervals, 2) Active recall - test yourself without looking at notes, 3) Teach others - explaining concepts helps solidify understanding. Use the Pomodoro technique: 25 minutes focused study, 5 minute break."
-    
-    elif any(word in msg_lower for word in ["exam", "test", "quiz"]):
-        return "For exam prep: 1) Review past papers and practice questions, 2) Focus on areas where you're weakest, 3) Get enough sleep before the exam, 4) During the test, read questions carefully and manage your time. Start with questions you know well to build confidence."
-    
-    else:
-        return "I'm here to help with your studies! You can ask me about specific subjects (math, science, history), study techniques, exam preparation, or any concept you're learning. What would you like to know more about?"
+    tokens = frozenset(_TOKEN_RE.findall(message.lower()))
+    for keywords, response in TOPIC_RESPONSES:
+        if tokens & keywords:
+            return response
+    return DEFAULT_TOPIC_RESPONSE
 
-@app.post("/api/study-recommendations", response_model=StudyPlanResponse)
-async def get_study_recommendations(request: StudyPlanRequest):
-    """Generate study recommendations using AI"""
-    try:
-        tasks_text = "\n".join([
-            f"- {t.get('title', 'Task')}: {t.get('progress', 0)}% done, due {t.get('due', 'N/A')}"
-            for t in request.tasks[:8]
-        ])
-        
-        prompt = f"""You are a study planning expert. Based on these tasks and progress, provide study recommendations and a weekly schedule.
+STUDY_PLAN_PROMPT = """You are a study planning expert. Based on these tasks and progress, provide study recommendations and a weekly schedule.
 
 Tasks:
-{tasks_text}
+{tasks}
 
-Progress: Accuracy {request.user_progress.get('accuracy', 'N/A')}, Efficiency {request.user_progress.get('efficiency', 'N/A')}
+Progress: Accuracy {accuracy}, Efficiency {efficiency}
 
 Generate ONLY JSON:
 {{
@@ -397,7 +851,22 @@ Generate ONLY JSON:
 }}
 """
 
-        result = query_ollama(prompt, max_tokens=500)
+@app.post("/api/study-recommendations", response_model=StudyPlanResponse)
+async def get_study_recommendations(request: StudyPlanRequest):
+    """Generate study recommendations using AI"""
+    try:
+        tasks_text = "\n".join([
+            f"- {t.get('title', 'Task')}: {t.get('progress', 0)}% done, due {t.get('due', 'N/A')}"
+            for t in request.tasks[:8]
+        ])
+        
+        prompt = STUDY_PLAN_PROMPT.format(
+            tasks=tasks_text,
+            accuracy=request.user_progress.get('accuracy', 'N/A'),
+            efficiency=request.user_progress.get('efficiency', 'N/A')
+        )
+
+        result = await query_ollama(prompt, max_tokens=500, temperature=0)
         result = clean_repeated_lines(result)
         plan_data = extract_json_from_text(result)
 
@@ -408,11 +877,11 @@ Generate ONLY JSON:
             )
         
         # Fallback recommendations
-        return generate_fallback_plan(request.tasks, request.user_progress)
+        return await asyncio.to_thread(generate_fallback_plan, request.tasks, request.user_progress)
         
     except Exception as e:
         print(f"Study plan error: {str(e)}")
-        return generate_fallback_plan(request.tasks, request.user_progress)
+        return await asyncio.to_thread(generate_fallback_plan, request.tasks, request.user_progress)
 
 def generate_fallback_plan(tasks: List[Dict], progress: Dict) -> StudyPlanResponse:
     """Generate study plan using rules"""
@@ -473,6 +942,33 @@ def generate_fallback_plan(tasks: List[Dict], progress: Dict) -> StudyPlanRespon
     
     return StudyPlanResponse(recommendations=recommendations, schedule=schedule)
 
+@app.post("/api/study-session", response_model=SessionResponse)
+async def study_session(request: SessionRequest):
+    """Generate quiz, summary and study plan concurrently in one request"""
+    # Each handler already falls back on its own, so gather never raises here
+    quiz, summary, plan = await asyncio.gather(
+        generate_quiz(request.quiz),
+        summarize_notes(request.summary),
+        get_study_recommendations(request.plan)
+    )
+    return SessionResponse(quiz=quiz, summary=summary, plan=plan)
+
+@app.post("/api/batch-generate", response_model=BatchResponse)
+async def batch_generate(request: BatchRequest):
+    """Run several prompts concurrently so Ollama can batch them together"""
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+
+    coros = [
+        query_ollama(
+            item.prompt,
+            max_tokens=item.max_tokens if item.max_tokens is not None else BATCH_MAX_TOKENS[item.kind]
+        )
+        for item in request.items
+    ]
+    results = await asyncio.gather(*coros)
+    return BatchResponse(results=[clean_repeated_lines(r) or "" for r in results])
+
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
@@ -481,7 +977,7 @@ def health_check():
         "ai_backend": "OpenAI",
         "chat_model": CHAT_MODEL,
         "summarization_model": SUMMARIZATION_MODEL,
-        "api_key_configured": openai.api_key is not None
+        "api_key_configured": api_key is not None
     }
 
 @app.get("/")
@@ -495,7 +991,10 @@ def root():
             "/api/generate-quiz",
             "/api/summarize-notes",
             "/api/chat",
+            "/api/chat/sync",
             "/api/study-recommendations",
+            "/api/batch-generate",
+            "/api/study-session",
             "/health",
             "/docs"
         ]
@@ -507,7 +1006,23 @@ if __name__ == "__main__":
     print("🚀 Smart Revision Assistant AI Backend")
     print("🤖 Using Local Ollama AI (100% Free, Offline)")
     print("="*60)
+    print(f"🧠 LLM backend: {LLM_BACKEND}" + (f" ({LLAMACPP_URL})" if LLM_BACKEND == "llamacpp" else ""))
+    print("⚙️  To serve more requests in parallel, set on the Ollama server (not here):")
+    print("   OLLAMA_NUM_PARALLEL=<n>        concurrent requests per loaded model")
+    print("   OLLAMA_MAX_LOADED_MODELS=<n>   models kept in memory at once")
+    print("="*60)
     print("🌐 Server: http://127.0.0.1:8001")
     print("📖 API Docs: http://127.0.0.1:8001/docs")
+    workers = int(os.getenv('WORKERS', os.cpu_count() or 1))
+    print(f"👷 Workers: {workers}")
+    print(f"🗄️  Response cache: {'Redis (shared)' if redis_client is not None else 'in-process (per worker)'}")
     print("="*60 + "\n")
-    uvicorn.run(app, host="127.0.0.1", port=8001)
\ No newline at end of file
+    # "auto" picks uvloop and httptools when installed (uvloop is not available on Windows)
+    uvicorn.run(
+        "main:app",
+        host="127.0.0.1",
+        port=8001,
+        workers=workers,
+        loop="auto",
+        http="auto"
+    )
\ No newline at end of file
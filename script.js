@@ -80,10 +80,44 @@ async function summarizeNotes(notes, maxLength = 200) {
   return result.summary;
 }
 
-async function chatWithTutor(message, context = '') {
-  const data = { message, context };
-  const result = await apiCall('/chat', data);
-  return result.response;
+// Streams the tutor's answer; onChunk receives the text received so far.
+// The final event (done: true) carries the cleaned answer and replaces it.
+async function chatWithTutor(message, context = '', onChunk = null) {
+  const response = await fetch(`${API_BASE}/chat`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ message, context })
+  });
+
+  if (!response.ok) {
+    throw new Error(`API call failed: ${response.statusText}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let text = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line: "data: {...}\n\n"
+    const events = buffer.split('\n\n');
+    buffer = events.pop();
+    for (const event of events) {
+      if (!event.startsWith('data: ')) continue;
+      const payload = JSON.parse(event.slice(6));
+      if (payload.error) console.warn('AI tutor unavailable, showing fallback answer');
+      text = payload.done ? payload.response : text + payload.response;
+      if (onChunk) onChunk(text);
+    }
+  }
+
+  return text.trim();
 }
 
 async function getStudyRecommendations() {
@@ -97,6 +131,22 @@ async function getStudyRecommendations() {
   return await apiCall('/study-recommendations', data);
 }
 
+// Quiz, summary and study plan in one request; the backend runs them concurrently.
+async function getStudySession(notes, topic = '', difficulty = 'medium', maxLength = 200) {
+  const data = {
+    quiz: { notes, topic, difficulty, num_questions: 5 },
+    summary: { notes, max_length: maxLength },
+    plan: {
+      tasks: state.tasks,
+      user_progress: {
+        accuracy: state.metrics.accuracy,
+        efficiency: state.metrics.efficiency
+      }
+    }
+  };
+  return await apiCall('/study-session', data);
+}
+
 // --- Notifications ---
 const notifListEl = document.getElementById('notifList');
 document.getElementById('btnGenerateNotif').onclick = () => {
@@ -384,6 +434,24 @@ function computeEfficiency() {
   return clamp(avg, 0, 100);
 }
 
+function renderPlanSuggestions(result) {
+  const recommendations = result.recommendations.map(rec => `<div class="card">💡 ${rec}</div>`).join('');
+  const schedule = Object.entries(result.schedule).map(([day, activities]) =>
+    `<div class="card"><strong>${day}:</strong> ${activities.join(', ')}</div>`
+  ).join('');
+
+  document.getElementById('planSuggestions').innerHTML = `
+    <div style="margin-bottom: 20px;">
+      <h4>AI Study Recommendations:</h4>
+      ${recommendations}
+    </div>
+    <div>
+      <h4>Suggested Schedule:</h4>
+      ${schedule}
+    </div>
+  `;
+}
+
 document.getElementById('btnGeneratePlan').onclick = async () => {
   const box = document.getElementById('planSuggestions');
 
@@ -391,22 +459,7 @@ document.getElementById('btnGeneratePlan').onclick = async () => {
   box.innerHTML = '<div class="card">🤖 AI is analyzing your progress and generating recommendations...</div>';
 
   try {
-    const result = await getStudyRecommendations();
-    const recommendations = result.recommendations.map(rec => `<div class="card">💡 ${rec}</div>`).join('');
-    const schedule = Object.entries(result.schedule).map(([day, activities]) =>
-      `<div class="card"><strong>${day}:</strong> ${activities.join(', ')}</div>`
-    ).join('');
-
-    box.innerHTML = `
-      <div style="margin-bottom: 20px;">
-        <h4>AI Study Recommendations:</h4>
-        ${recommendations}
-      </div>
-      <div>
-        <h4>Suggested Schedule:</h4>
-        ${schedule}
-      </div>
-    `;
+    renderPlanSuggestions(await getStudyRecommendations());
   } catch (error) {
     box.innerHTML = '<div class="card">❌ Failed to get AI recommendations. Please check if the backend is running.</div>';
     console.error('Study plan error:', error);
@@ -462,6 +515,22 @@ document.getElementById('btnFetchUrl').onclick = async () => {
   }
 };
 
+function renderSummary(summary) {
+  document.getElementById('summaryBox').innerHTML = `<div class="card"><strong>AI Summary:</strong><br>${summary}</div>`;
+}
+
+function setQuizFromAI(result) {
+  state.quiz = result.questions.map(q => ({
+    type: q.type === 'multiple_choice' ? 'mcq' : 'short',
+    prompt: q.question,
+    options: q.options || [],
+    answer: q.correct_answer,
+    explanation: q.explanation
+  }));
+  state.quizSubmitted = false;
+  renderQuiz();
+}
+
 document.getElementById('btnSummarize').onclick = async () => {
   const text = (document.getElementById('rawNotes').value || '').trim();
   if(!text) { alert('Paste notes first'); return; }
@@ -471,8 +540,7 @@ document.getElementById('btnSummarize').onclick = async () => {
   document.getElementById('summaryBox').innerHTML = '<div class="card">🤖 AI is summarizing your notes...</div>';
 
   try {
-    const summary = await summarizeNotes(text);
-    document.getElementById('summaryBox').innerHTML = `<div class="card"><strong>AI Summary:</strong><br>${summary}</div>`;
+    renderSummary(await summarizeNotes(text));
   } catch (error) {
     document.getElementById('summaryBox').innerHTML = '<div class="card">❌ Failed to summarize. Please check if the AI backend is running.</div>';
     console.error('Summarization error:', error);
@@ -490,16 +558,7 @@ document.getElementById('btnGenerateQuiz').onclick = async () => {
   document.getElementById('quizBox').innerHTML = '<div class="card">🤖 AI is generating your quiz...</div>';
 
   try {
-    const result = await generateAIQuiz(text);
-    state.quiz = result.questions.map(q => ({
-      type: q.type === 'multiple_choice' ? 'mcq' : 'short',
-      prompt: q.question,
-      options: q.options || [],
-      answer: q.correct_answer,
-      explanation: q.explanation
-    }));
-    state.quizSubmitted = false;
-    renderQuiz();
+    setQuizFromAI(await generateAIQuiz(text));
   } catch (error) {
     document.getElementById('quizBox').innerHTML = '<div class="card">❌ Failed to generate quiz. Please check if the AI backend is running.</div>';
     console.error('Quiz generation error:', error);
@@ -508,6 +567,32 @@ document.getElementById('btnGenerateQuiz').onclick = async () => {
   save();
 };
 
+// Summary, quiz and study plan from one request; the backend generates them concurrently
+document.getElementById('btnStudySession').onclick = async () => {
+  const text = (document.getElementById('rawNotes').value || '').trim();
+  if(!text) { alert('Paste notes first'); return; }
+  state.notes = text;
+
+  // Show loading
+  document.getElementById('summaryBox').innerHTML = '<div class="card">🤖 AI is summarizing your notes...</div>';
+  document.getElementById('quizBox').innerHTML = '<div class="card">🤖 AI is generating your quiz...</div>';
+  document.getElementById('planSuggestions').innerHTML = '<div class="card">🤖 AI is analyzing your progress and generating recommendations...</div>';
+
+  try {
+    const result = await getStudySession(text);
+    renderSummary(result.summary.summary);
+    setQuizFromAI(result.quiz);
+    renderPlanSuggestions(result.plan);
+  } catch (error) {
+    document.getElementById('summaryBox').innerHTML = '<div class="card">❌ Failed to start study session. Please check if the AI backend is running.</div>';
+    document.getElementById('quizBox').innerHTML = '';
+    document.getElementById('planSuggestions').innerHTML = '';
+    console.error('Study session error:', error);
+  }
+
+  save();
+};
+
 document.getElementById('btnSubmitQuiz').onclick = () => {
   const answers = [];
   document.querySelectorAll('[data-qidx]').forEach(el=>{
@@ -597,7 +682,11 @@ document.getElementById('btnSendChat').onclick = async () => {
   try {
     // Get context from current notes
     const context = state.notes || '';
-    const response = await chatWithTutor(message, context);
+    const response = await chatWithTutor(message, context, partial => {
+      typingDiv.innerHTML = '<strong>🤖 AI Tutor:</strong> ';
+      typingDiv.appendChild(document.createTextNode(partial));
+      chatHistory.scrollTop = chatHistory.scrollHeight;
+    });
 
     // Remove typing indicator
     document.getElementById('typingIndicator').remove();